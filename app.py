@@ -2,6 +2,11 @@ import streamlit as st
 import numpy as np
 import plotly.graph_objects as go
 from scipy import signal
+from signal_kernels import fm_modulate, fsk_modulate, phase_gradient
+
+# Display precision: the plot resolves far less than float32, so every signal
+# array is kept in single precision to halve memory traffic and JSON size
+DTYPE = np.float32
 
 # Set page config
 st.set_page_config(
@@ -36,62 +41,148 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+rng = np.random.default_rng()
+
 # Signal generators
-def generate_signal(signal_type, t, amplitude=1.0, frequency=1.0, offset=0.0):
+def signal_phase(t, frequency):
+    return (2 * np.pi * frequency) * t
+
+# Branchless square/triangle waves from the fractional cycle of the phase, no transcendental calls
+def fast_square(phase, duty=0.5):
+    cycles = np.mod(phase * (1 / (2 * np.pi)), 1.0)
+    return np.where(cycles < duty, DTYPE(1.0), DTYPE(-1.0))
+
+def fast_triangle(phase):
+    cycles = np.mod(phase * (1 / (2 * np.pi)), 1.0)
+    cycles -= 0.5
+    np.abs(cycles, out=cycles)
+    cycles *= -4.0
+    cycles += 1.0
+    return cycles
+
+def generate_signal(signal_type, t, amplitude=1.0, frequency=1.0, offset=0.0, phase=None):
+    if phase is None:
+        phase = signal_phase(t, frequency)
     if signal_type == "Sine Wave":
-        return amplitude * np.sin(2 * np.pi * frequency * t) + offset
+        return amplitude * np.sin(phase) + offset
     elif signal_type == "Square Wave":
-        return amplitude * signal.square(2 * np.pi * frequency * t) + offset
+        return amplitude * fast_square(phase) + offset
     elif signal_type == "Triangle Wave":
-        return amplitude * signal.sawtooth(2 * np.pi * frequency * t, 0.5) + offset
+        return amplitude * fast_triangle(phase) + offset
     elif signal_type == "Clock Pulse":
-        return amplitude * signal.square(2 * np.pi * frequency * t, duty=0.5) + offset
+        return amplitude * fast_square(phase, duty=0.5) + offset
     elif signal_type == "Binary Data":
-        return amplitude * np.array([1 if np.random.random() > 0.5 else 0 for _ in range(len(t))]) + offset
+        return amplitude * rng.integers(0, 2, size=t.size).astype(DTYPE) + offset
     elif signal_type == "Carrier Wave":
-        return amplitude * np.sin(2 * np.pi * frequency * t) + offset
+        return amplitude * np.sin(phase) + offset
     return np.zeros_like(t)
 
+# Evaluate each distinct (signal_type, frequency) waveform once and broadcast the
+# per-channel amplitude/offset over it; `bases` may supply precomputed unit waveforms
+def generate_signals(t, specs, bases=None):
+    bases = dict(bases or {})
+    groups = {}
+    for i, (signal_type, frequency, amplitude, offset) in enumerate(specs):
+        groups.setdefault((signal_type, frequency), []).append((i, amplitude, offset))
+    signals = [None] * len(specs)
+    for key, members in groups.items():
+        if key not in bases:
+            bases[key] = generate_signal(key[0], t, 1.0, key[1], 0.0)
+        indices, amplitudes, offsets = zip(*members)
+        bank = np.array(amplitudes, dtype=DTYPE)[:, None] * bases[key] + np.array(offsets, dtype=DTYPE)[:, None]
+        for i, row in zip(indices, bank):
+            signals[i] = row
+    return signals
+
 # Modulation
 
-def modulate_signal(carrier_freq, message_signal, t, mod_type, mod_index=1.0):
-    carrier = np.sin(2 * np.pi * carrier_freq * t)
+# `carrier` is the precomputed unit carrier sin(carrier_phase); it is never modified
+def modulate_signal(carrier, carrier_phase, message_signal, t, mod_type, mod_index=1.0):
+    # AM/ASK/PSK write into a single output buffer instead of chaining temporaries
     if mod_type == "AM":
-        return (1 + mod_index * message_signal) * carrier
+        out = np.multiply(message_signal, mod_index, out=np.empty_like(carrier))
+        np.add(out, 1.0, out=out)
+        return np.multiply(out, carrier, out=out)
     elif mod_type == "FM":
-        integrated_signal = np.cumsum(message_signal) * (t[1] - t[0])
-        return np.sin(2 * np.pi * carrier_freq * t + mod_index * integrated_signal)
+        return fm_modulate(message_signal, carrier_phase, t[1] - t[0], mod_index)
     elif mod_type == "PM":
-        return np.sin(2 * np.pi * carrier_freq * t + mod_index * message_signal)
+        return np.sin(carrier_phase + mod_index * message_signal)
     elif mod_type == "ASK":
-        return carrier * ((message_signal > 0) * 0.5 + 0.5)
+        out = np.greater(message_signal, 0, out=np.empty_like(carrier))
+        np.multiply(out, 0.5, out=out)
+        np.add(out, 0.5, out=out)
+        return np.multiply(out, carrier, out=out)
     elif mod_type == "FSK":
-        return np.where(message_signal > 0,
-                        np.sin(2 * np.pi * carrier_freq * 1.5 * t),
-                        np.sin(2 * np.pi * carrier_freq * t))
+        return fsk_modulate(message_signal, carrier_phase)
     elif mod_type == "PSK":
-        return carrier * np.sign(message_signal)
+        out = np.sign(message_signal, out=np.empty_like(carrier))
+        return np.multiply(out, carrier, out=out)
     return np.zeros_like(t)
 
-# Simple demodulation (envelope and threshold based)
-def demodulate_signal(signal, mod_type):
+# Simple demodulation (envelope, phase and threshold based). Thresholds compare
+# straight into a DTYPE buffer, with no intermediate bool array
+def demodulate_signal(received, mod_type):
     if mod_type == "AM":
-        return np.abs(signal)
+        return np.abs(received)
     elif mod_type == "FM" or mod_type == "PM":
-        return np.gradient(np.unwrap(np.angle(signal + 1j*signal)))
+        # Instantaneous frequency from the phase of the analytic signal
+        return phase_gradient(signal.hilbert(received).astype(np.complex64, copy=False))
     elif mod_type == "ASK":
-        return signal > 0.1
+        return np.greater(received, 0.1, out=np.empty_like(received))
     elif mod_type == "PSK" or mod_type == "FSK":
-        return (signal > 0).astype(float)
-    return np.zeros_like(signal)
+        return np.greater(received, 0, out=np.empty_like(received))
+    return np.zeros_like(received)
+
+# Scale (and optionally demodulate) one channel's modulated signal
+def render_channel(modulated, amplitude, offset, demod_type=None):
+    if demod_type is not None:
+        modulated = demodulate_signal(modulated, demod_type)
+    return amplitude * modulated + offset
+
+# Cached constant signals (recomputed only when their parameters change)
+@st.cache_data
+def get_time(n=10000, tmax=10):
+    return np.linspace(0, tmax, n, dtype=DTYPE)
+
+@st.cache_data
+def get_phase(frequency, n=10000, tmax=10):
+    return signal_phase(get_time(n, tmax), frequency)
+
+@st.cache_data
+def get_message(n=10000, tmax=10):
+    return generate_signal("Sine Wave", get_time(n, tmax), 1.0, 1.0, 0.0, phase=get_phase(1.0, n, tmax))
+
+@st.cache_data
+def get_carrier(carrier_freq, n=10000, tmax=10):
+    return generate_signal("Carrier Wave", get_time(n, tmax), 1.0, carrier_freq, 0.0,
+                           phase=get_phase(carrier_freq, n, tmax))
+
+@st.cache_data
+def get_modulated(mod_type, carrier_freq, mod_index, n=10000, tmax=10):
+    return modulate_signal(get_carrier(carrier_freq, n, tmax), get_phase(carrier_freq, n, tmax),
+                           get_message(n, tmax), get_time(n, tmax), mod_type, mod_index)
 
 # Plot
 
-def plot_signals(t, signals, colors, names, visible):
-    fig = go.Figure()
-    for signal, color, name, is_visible in zip(signals, colors, names, visible):
-        if is_visible:
-            fig.add_trace(go.Scatter(x=t, y=signal, name=name, line=dict(color=color, width=2)))
+# Min/max decimation down to roughly screen resolution: keeps each bucket's
+# extremes so fast carriers keep their envelope instead of aliasing
+def decimate_for_display(t, y, max_points=2000):
+    if y.size <= max_points:
+        return t, y
+    size = -(-y.size // (max_points // 2))
+    buckets = -(-y.size // size)
+    # Pad the shorter last bucket with the final sample rather than dropping the tail
+    yb = np.pad(y, (0, buckets * size - y.size), mode='edge').reshape(buckets, size)
+    lo, hi = yb.argmin(axis=1), yb.argmax(axis=1)
+    idx = np.stack([np.minimum(lo, hi), np.maximum(lo, hi)], axis=1)
+    idx += (np.arange(buckets) * size)[:, None]
+    # Map padded positions back onto the final sample and always keep both endpoints
+    idx = np.unique(np.concatenate(([0], np.minimum(idx.ravel(), y.size - 1), [y.size - 1])))
+    return t[idx], y[idx]
+
+# One trace per channel; built once per session and then updated in place
+def build_figure(colors):
+    fig = go.Figure([go.Scatter(line=dict(color=color, width=2)) for color in colors])
     fig.update_layout(
         title="Signal Visualization",
         xaxis_title="Time (s)",
@@ -107,6 +198,15 @@ def plot_signals(t, signals, colors, names, visible):
     )
     return fig
 
+def plot_signals(fig, t, signals, names, visible):
+    with fig.batch_update():
+        for trace, signal, name, is_visible in zip(fig.data, signals, names, visible):
+            trace.name = name
+            trace.visible = is_visible
+            # Hidden traces are sent without data
+            trace.x, trace.y = decimate_for_display(t, signal) if is_visible else (None, None)
+    return fig
+
 # Controls UI
 def channel_controls(channel_num, key_prefix):
     with st.expander(f"Channel {channel_num} Controls", expanded=True):
@@ -139,13 +239,53 @@ def channel_controls(channel_num, key_prefix):
                 mod_index = 1.0
         return enabled, final_signal_type, amplitude, frequency, offset, mod_index
 
+# Channel pipeline
+
+def compute_signals(t, channels, carrier_freq):
+    carrier = get_carrier(carrier_freq)
+
+    # Reuse the previous rerun's result for channels whose inputs are unchanged
+    keys = [(*channel[1:], carrier_freq) for channel in channels]
+    signals = [None] * len(channels)
+    waveforms = {}
+    for i, (enabled, signal_type, amplitude, frequency, offset, mod_index) in enumerate(channels):
+        cached_key, cached_signal = st.session_state.get(f"sig_{i}", (None, None))
+        if cached_key == keys[i]:
+            signals[i] = cached_signal
+        elif "Message Signal" in signal_type:
+            waveforms[i] = ("Sine Wave", frequency, amplitude, offset)
+        elif "Clock Pulse" in signal_type:
+            waveforms[i] = ("Clock Pulse", frequency, amplitude, offset)
+        elif "Carrier Wave" in signal_type:
+            waveforms[i] = ("Carrier Wave", carrier_freq, amplitude, offset)
+        elif "Modulated" in signal_type:
+            mod_type = signal_type.split()[0]
+            signals[i] = render_channel(get_modulated(mod_type, carrier_freq, mod_index), amplitude, offset)
+        elif "Demodulated" in signal_type:
+            mod_type = signal_type.split()[0]
+            signals[i] = render_channel(get_modulated(mod_type, carrier_freq, mod_index), amplitude, offset,
+                                        mod_type)
+        else:
+            signals[i] = np.zeros_like(t)
+
+    # Channels sharing a waveform are generated from a single base array
+    generated = generate_signals(t, list(waveforms.values()),
+                                 bases={("Carrier Wave", carrier_freq): carrier})
+    for i, signal in zip(waveforms, generated):
+        signals[i] = signal
+
+    for i, key in enumerate(keys):
+        st.session_state[f"sig_{i}"] = (key, signals[i])
+    return signals
+
 # Main App
 
 def main():
     st.title("3-Channel Signal Modulation Oscilloscope")
-    t = np.linspace(0, 10, 10000)
+    t = get_time()
 
-    with st.sidebar:
+    # Batch the controls so dragging a slider does not rerun the pipeline per tick
+    with st.sidebar, st.form("controls"):
         st.header("Global Settings")
         carrier_freq = st.slider("Carrier Frequency (Hz)", 1, 50, 10, key="global_carrier_freq")
         channels = []
@@ -153,50 +293,39 @@ def main():
             st.markdown(f"<div class='channel-controls'>", unsafe_allow_html=True)
             channels.append(channel_controls(i+1, f"ch{i+1}"))
             st.markdown("</div>", unsafe_allow_html=True)
+        # Applying new settings also resumes a frozen display so the plot matches them
+        applied = st.form_submit_button("Apply", use_container_width=True,
+                                        on_click=lambda: st.session_state.update(frozen=False))
 
-    signals, colors, names, visible = [], ['yellow', 'cyan', 'magenta'], [], []
-    message_signal = generate_signal("Sine Wave", t, 1.0, 1.0, 0.0)
-    carrier = generate_signal("Carrier Wave", t, 1.0, carrier_freq, 0.0)
+    colors = ['yellow', 'cyan', 'magenta']
+    names = [f"CH{i+1}: {channel[1]}" for i, channel in enumerate(channels)]
+    visible = [channel[0] for channel in channels]
 
-    for i, (enabled, signal_type, amplitude, frequency, offset, mod_index) in enumerate(channels):
-        if "Message Signal" in signal_type:
-            signal = generate_signal("Sine Wave", t, amplitude, frequency, offset)
-        elif "Clock Pulse" in signal_type:
-            signal = generate_signal("Clock Pulse", t, amplitude, frequency, offset)
-        elif "Carrier Wave" in signal_type:
-            signal = generate_signal("Carrier Wave", t, amplitude, carrier_freq, offset)
-        elif "Modulated" in signal_type:
-            mod_type = signal_type.split()[0]
-            signal = modulate_signal(carrier_freq, message_signal, t, mod_type, mod_index)
-            signal = amplitude * signal + offset
-        elif "Demodulated" in signal_type:
-            mod_type = signal_type.split()[0]
-            modulated = modulate_signal(carrier_freq, message_signal, t, mod_type, mod_index)
-            signal = demodulate_signal(modulated, mod_type)
-            signal = amplitude * signal + offset
-        else:
-            signal = np.zeros_like(t)
-
-        signals.append(signal)
-        names.append(f"CH{i+1}: {signal_type}")
-        visible.append(enabled)
+    # Form controls only take effect on Apply; other reruns (Freeze/Run/Reset)
+    # reuse the signals computed for the last submitted settings
+    if applied or 'signals' not in st.session_state:
+        st.session_state['signals'] = compute_signals(t, channels, carrier_freq)
+    signals = st.session_state['signals']
 
     col1, col2, col3 = st.columns([1, 10, 1])
     with col2:
-        live_plot = st.empty()
         if 'frozen' not in st.session_state:
             st.session_state['frozen'] = False
-        while not st.session_state['frozen']:
-            fig = plot_signals(t, signals, colors, names, visible)
-            live_plot.plotly_chart(fig, use_container_width=True)
+        if 'fig' not in st.session_state:
+            st.session_state['fig'] = build_figure(colors)
+        # Render once per rerun; while frozen keep showing the last data
+        if not st.session_state['frozen']:
+            plot_signals(st.session_state['fig'], t, signals, names, visible)
+        st.plotly_chart(st.session_state['fig'], use_container_width=True)
 
     col1, col2, col3 = st.columns(3)
+    # Callbacks run before the next script body, so the chart above sees the new state
     with col1:
-        if st.button("Freeze", use_container_width=True):
-            st.session_state['frozen'] = True
+        st.button("Freeze", use_container_width=True,
+                  on_click=lambda: st.session_state.update(frozen=True))
     with col2:
-        if st.button("Run", use_container_width=True):
-            st.session_state['frozen'] = False
+        st.button("Run", use_container_width=True,
+                  on_click=lambda: st.session_state.update(frozen=False))
     with col3:
         if st.button("Reset", use_container_width=True):
             st.experimental_rerun()